@@ -1,8 +1,9 @@
 # One-file Arbitrage Bot (compact UI, i18n + auto top watcher + New Tokens)
 # Env: TELEGRAM_BOT_TOKEN
-# Replit-ready (Flask keep-alive) + Raw Telegram Bot API + requests only.
+# Replit-ready (Flask keep-alive) + Raw Telegram Bot API + requests (ccxt optional).
 
-import os, json, time, threading, logging
+import os, sys, json, time, threading, logging, asyncio, importlib.util, signal
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Dict, Any, List, Tuple, Optional
 
@@ -32,6 +33,22 @@ WATCHLIST = [
 # CoinPaprika (free, no key)
 PAPR_BASE = "https://api.coinpaprika.com/v1"
 
+# bulk ticker snapshots are reused by every pair/chat for N seconds
+BULK_TTL = 10
+
+# a venue that hasn't answered within N seconds is left out of that scan
+VENUE_TIMEOUT = 8
+
+# extra venues served through ccxt, e.g. CCXT_EXCHANGES="kraken,bitfinex"
+CCXT_EXCHANGES = [x.strip().lower() for x in os.getenv("CCXT_EXCHANGES", "").split(",") if x.strip()]
+
+# ccxt load_markets() results are kept on disk for N seconds
+MARKETS_CACHE_DIR = os.getenv("MARKETS_CACHE_DIR", ".cache/markets")
+MARKETS_TTL = 24 * 3600
+
+# a ccxt venue whose setup failed sits out scans for N seconds
+CCXT_RETRY = 300
+
 # Enable logs
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
 log = logging.getLogger("arb-bot")
@@ -213,121 +230,474 @@ def to_usdt_pair(symbol: str) -> str:
     return ""
 
 def norm_pair_for_exch(pair: str, exch: str) -> str:
-    base, quote = pair.split("/")
-    if exch in ("binance", "mexc", "bitget", "bybit"):
-        return f"{base}{quote}"
-    if exch in ("okx", "kucoin"):
-        return f"{base}-{quote}"
-    if exch == "gate":
-        return f"{base}_{quote}"
-    if exch == "htx":  # Huobi/HTX uses lowercase
-        return f"{base}{quote}".lower()
-    return pair
+    ad = ADAPTERS.get(exch)
+    return ad.symbol(pair) if ad else pair
 
 def fmt_price(x: float) -> str:
     s = f"{x:.10f}".rstrip("0").rstrip(".")
     return s if len(s) >= 8 else s + " " * (8 - len(s))
 
+# ----------------------- EXCHANGE ADAPTERS -----------------------
+# Every venue is an adapter behind one async interface:
+#   symbol(pair)           -> native symbol ("BTC/USDT" -> "BTCUSDT", "BTC-USDT", ...)
+#   await ticker(pair)     -> (bid, ask)
+#   await bulk()           -> {native_symbol: (bid, ask)}  one call for every pair
+#   await depth(pair, n)   -> (bids, asks) as [[price, qty], ...]
+# REST venues are declared below; any other ccxt id can be added through
+# CCXT_EXCHANGES and is served by CcxtAdapter.
+
+_HTTP = requests.Session()
+
+# all adapters run on one background event loop, started on first use
+_LOOP: Optional[asyncio.AbstractEventLoop] = None
+_LOOP_LOCK = threading.Lock()
+
+def run_async(coro):
+    global _LOOP
+    with _LOOP_LOCK:
+        if _LOOP is None:
+            _LOOP = asyncio.new_event_loop()
+            _LOOP.set_default_executor(ThreadPoolExecutor(max_workers=32))
+            threading.Thread(target=_LOOP.run_forever, daemon=True).start()
+    return asyncio.run_coroutine_threadsafe(coro, _LOOP).result()
+
+def _f(x) -> float:
+    try:
+        return float(x)
+    except (TypeError, ValueError):
+        return 0.0
+
+def _first(rows) -> dict:
+    return rows[0] if isinstance(rows, list) and rows else {}
+
+def _ba(d: dict, bid_key: str, ask_key: str) -> Tuple[float,float]:
+    return _f(d.get(bid_key)), _f(d.get(ask_key))
+
+def _book(rows, sym_key: str, bid_key: str, ask_key: str) -> Dict[str, Tuple[float,float]]:
+    if not isinstance(rows, list):
+        return {}
+    return {r[sym_key]: _ba(r, bid_key, ask_key) for r in rows if r.get(sym_key)}
+
+def _levels(rows, n: int) -> List[List[float]]:
+    return [[_f(r[0]), _f(r[1])] for r in (rows or [])[:n]]
+
+def _depth(d: dict, bids_key: str, asks_key: str, n: int):
+    return _levels(d.get(bids_key), n), _levels(d.get(asks_key), n)
+
+def _depth_limit(n: int, sizes: Tuple[int, ...]) -> int:
+    # venues with fixed book sizes get the next size up; parsers trim back to n
+    if not sizes:
+        return n
+    return next((x for x in sizes if x >= n), sizes[-1])
+
+class RateLimiter:
+    # spaces requests of one venue to at most `rps` per second (0 = no limit)
+    def __init__(self, rps: float):
+        self.gap = 1.0 / rps if rps > 0 else 0.0
+        self.next_at = 0.0
+        self.lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self.lock:
+            now = time.monotonic()
+            delay = self.next_at - now
+            self.next_at = max(now, self.next_at) + self.gap
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+class Adapter:
+    def __init__(self, key: str, label: str, rps: float = 0):
+        self.key, self.label = key, label
+        self.limiter = RateLimiter(rps)
+        self._bulk: Dict[str, Tuple[float,float]] = {}
+        self._bulk_at = 0.0
+        self._bulk_lock = asyncio.Lock()
+
+    def symbol(self, pair: str) -> str:
+        return pair
+
+    async def ticker(self, pair: str) -> Tuple[float,float]:
+        raise NotImplementedError
+
+    async def fetch_bulk(self) -> Optional[Dict[str, Tuple[float,float]]]:
+        return None  # None = no snapshot (no bulk endpoint or error body)
+
+    async def depth(self, pair: str, n: int = 5):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+    def ready(self) -> bool:
+        return True
+
+    def bulk_fresh(self) -> bool:
+        return time.time() - self._bulk_at <= BULK_TTL
+
+    async def bulk(self) -> Optional[Dict[str, Tuple[float,float]]]:
+        # snapshot shared by every pair/chat until BULK_TTL runs out
+        async with self._bulk_lock:
+            if self.bulk_fresh():
+                return self._bulk
+            data = await self.fetch_bulk()
+            if not data:
+                return None  # never cache an empty snapshot: tickers take over
+            self._bulk, self._bulk_at = data, time.time()
+            return data
+
+class RestAdapter(Adapter):
+    # ticker = (url, params(sym), parse(json) -> (bid, ask))
+    # bulk   = (url, params,      parse(json) -> {sym: (bid, ask)})
+    # depth  = (url, params(sym, n), parse(json, n) -> (bids, asks))
+    # depth_sizes = book sizes the depth endpoint accepts (empty = any n)
+    def __init__(self, key: str, label: str, rps: float, fmt, ticker, bulk=None, depth=None,
+                 depth_sizes: Tuple[int, ...] = ()):
+        super().__init__(key, label, rps)
+        self.fmt = fmt
+        self.ticker_ep, self.bulk_ep, self.depth_ep = ticker, bulk, depth
+        self.depth_sizes = depth_sizes
+
+    def symbol(self, pair: str) -> str:
+        base, quote = pair.split("/")
+        return self.fmt(base, quote)
+
+    async def _get(self, url: str, params: dict):
+        await self.limiter.wait()
+        r = await asyncio.to_thread(_HTTP.get, url, params=params, timeout=10)
+        return r.json() if r.ok else None
+
+    async def ticker(self, pair: str) -> Tuple[float,float]:
+        url, params, parse = self.ticker_ep
+        j = await self._get(url, params(self.symbol(pair)))
+        return parse(j) if j else (0.0, 0.0)
+
+    async def fetch_bulk(self):
+        if not self.bulk_ep:
+            return None
+        url, params, parse = self.bulk_ep
+        j = await self._get(url, params)
+        # okx/bybit/htx/kucoin send errors as HTTP 200 bodies that parse to {}
+        return (parse(j) if j else None) or None
+
+    async def depth(self, pair: str, n: int = 5):
+        if not self.depth_ep:
+            raise NotImplementedError(f"{self.key}: no depth endpoint")
+        url, params, parse = self.depth_ep
+        j = await self._get(url, params(self.symbol(pair), _depth_limit(n, self.depth_sizes)))
+        return parse(j, n) if j else ([], [])
+
+# ---- ccxt fallback: load_markets() is cached on disk between restarts ----
+
+def _markets_path(key: str) -> str:
+    return os.path.join(MARKETS_CACHE_DIR, f"{key}.json")
+
+def load_markets_cache(key: str) -> Optional[dict]:
+    path = _markets_path(key)
+    try:
+        if time.time() - os.path.getmtime(path) > MARKETS_TTL:
+            return None
+        with open(path, encoding="utf-8") as fh:
+            data = json.load(fh)
+        saved_at = os.path.getmtime(path)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or not isinstance(data.get("markets"), dict):
+        return None  # corrupt / foreign file: treat as a miss
+    data["saved_at"] = saved_at
+    return data
+
+def save_markets_cache(key: str, markets: dict, currencies: dict):
+    path = _markets_path(key)
+    try:
+        os.makedirs(MARKETS_CACHE_DIR, exist_ok=True)
+        with open(path + ".tmp", "w", encoding="utf-8") as fh:
+            json.dump({"markets": markets, "currencies": currencies}, fh, default=str)
+        os.replace(path + ".tmp", path)
+    except OSError as e:
+        log.warning("markets cache %s not saved: %s", key, e)
+
+class CcxtAdapter(Adapter):
+    def __init__(self, ex_id: str, label: str = ""):
+        # ccxt throttles itself (enableRateLimit), so no extra limiter here
+        super().__init__(ex_id, label or f"⚪ {ex_id}")
+        self._ex = None
+        self._setup: Optional[asyncio.Task] = None
+        self._refresh: Optional[asyncio.Task] = None
+        self._retry_at = 0.0
+        self._markets_at = 0.0
+
+    def ready(self) -> bool:
+        return time.time() >= self._retry_at
+
+    async def _open(self):
+        # ccxt is heavy to import: do it in a worker so REST venues on this loop keep going
+        ccxt_async = await asyncio.to_thread(importlib.import_module, "ccxt.async_support")
+        ex = getattr(ccxt_async, self.key)({"enableRateLimit": True, "timeout": 10000})
+        try:
+            cached = await asyncio.to_thread(load_markets_cache, self.key)
+            if cached:
+                ex.set_markets(cached["markets"], cached.get("currencies"))
+                self._markets_at = cached["saved_at"]
+            else:
+                await self._load_markets(ex)
+        except BaseException:  # incl. CancelledError on close()
+            await ex.close()
+            raise
+        return ex
+
+    async def _load_markets(self, ex, reload: bool = False):
+        await ex.load_markets(reload=reload)
+        self._markets_at = time.time()
+        await asyncio.to_thread(save_markets_cache, self.key, ex.markets, ex.currencies)
+
+    async def _run_setup(self):
+        try:
+            self._ex = await self._open()
+        except Exception as e:
+            self._retry_at = time.time() + CCXT_RETRY
+            log.warning("ccxt %s setup failed, retry in %ss: %s", self.key, CCXT_RETRY, e)
+        finally:
+            self._setup = None
+
+    async def _run_refresh(self):
+        # long-running process: pick up pairs listed since the last load
+        try:
+            await self._load_markets(self._ex, reload=True)
+        except Exception as e:
+            self._markets_at = time.time() - MARKETS_TTL + CCXT_RETRY
+            log.warning("ccxt %s markets refresh failed, retry in %ss: %s", self.key, CCXT_RETRY, e)
+        finally:
+            self._refresh = None
+
+    async def client(self):
+        # setup and refresh run as tasks of their own, so a scan that hits
+        # VENUE_TIMEOUT drops out without cancelling them; later scans reuse them
+        if self._ex is None:
+            if self._setup is None:
+                if not self.ready():
+                    raise RuntimeError(f"ccxt {self.key} disabled until retry")
+                self._setup = asyncio.ensure_future(self._run_setup())
+            await asyncio.shield(self._setup)
+            if self._ex is None:
+                raise RuntimeError(f"ccxt {self.key} setup failed")
+        elif self._refresh is None and time.time() - self._markets_at > MARKETS_TTL:
+            self._refresh = asyncio.ensure_future(self._run_refresh())
+        return self._ex
+
+    async def ticker(self, pair: str) -> Tuple[float,float]:
+        ex = await self.client()
+        if pair not in ex.markets:
+            return 0.0, 0.0
+        t = await ex.fetch_ticker(pair)
+        return _ba(t, "bid", "ask")
+
+    async def fetch_bulk(self):
+        ex = await self.client()
+        if not ex.has.get("fetchTickers"):
+            return None
+        ts = await ex.fetch_tickers()
+        return {s: _ba(t, "bid", "ask") for s, t in ts.items()}
+
+    async def depth(self, pair: str, n: int = 5):
+        ex = await self.client()
+        ob = await ex.fetch_order_book(pair, n)
+        return _depth(ob, "bids", "asks", n)
+
+    async def close(self):
+        # releases the aiohttp session behind the async ccxt client
+        for task in (self._setup, self._refresh):
+            if task is not None:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        if self._ex is not None:
+            ex, self._ex = self._ex, None
+            await ex.close()
+
+# ---- registry ----
+
+ADAPTERS: Dict[str, Adapter] = {}
+
+def register_adapter(ad: Adapter) -> Adapter:
+    ADAPTERS[ad.key] = ad
+    return ad
+
+def _htx_tick(j: dict) -> Tuple[float,float]:
+    t = j.get("tick") or {}
+    return _f((t.get("bid") or [0])[0]), _f((t.get("ask") or [0])[0])
+
+register_adapter(RestAdapter(
+    "binance", "🟡 binance", 20, lambda b, q: f"{b}{q}",
+    ticker=("https://api.binance.com/api/v3/ticker/bookTicker",
+            lambda s: {"symbol": s}, lambda j: _ba(j, "bidPrice", "askPrice")),
+    bulk=("https://api.binance.com/api/v3/ticker/bookTicker",
+          {}, lambda j: _book(j, "symbol", "bidPrice", "askPrice")),
+    depth=("https://api.binance.com/api/v3/depth",
+           lambda s, n: {"symbol": s, "limit": n}, lambda j, n: _depth(j, "bids", "asks", n)),
+    depth_sizes=(5, 10, 20, 50, 100, 500, 1000, 5000),
+))
+register_adapter(RestAdapter(
+    "bitget", "🔵 bitget", 10, lambda b, q: f"{b}{q}",
+    ticker=("https://api.bitget.com/api/spot/v1/market/bestBidAsk",
+            lambda s: {"symbol": s}, lambda j: _ba(_first(j.get("data")), "bestBid", "bestAsk")),
+    bulk=("https://api.bitget.com/api/v2/spot/market/tickers",
+          {}, lambda j: _book(j.get("data"), "symbol", "bidPr", "askPr")),
+    depth=("https://api.bitget.com/api/v2/spot/market/orderbook",
+           lambda s, n: {"symbol": s, "limit": n},
+           lambda j, n: _depth(j.get("data") or {}, "bids", "asks", n)),
+))
+register_adapter(RestAdapter(
+    "mexc", "🟢 mexc", 10, lambda b, q: f"{b}{q}",
+    ticker=("https://api.mexc.com/api/v3/ticker/bookTicker",
+            lambda s: {"symbol": s}, lambda j: _ba(j, "bidPrice", "askPrice")),
+    bulk=("https://api.mexc.com/api/v3/ticker/bookTicker",
+          {}, lambda j: _book(j, "symbol", "bidPrice", "askPrice")),
+    depth=("https://api.mexc.com/api/v3/depth",
+           lambda s, n: {"symbol": s, "limit": n}, lambda j, n: _depth(j, "bids", "asks", n)),
+))
+register_adapter(RestAdapter(
+    "htx", "🔴 htx", 10, lambda b, q: f"{b}{q}".lower(),  # Huobi/HTX uses lowercase
+    ticker=("https://api.huobi.pro/market/detail/merged",
+            lambda s: {"symbol": s}, _htx_tick),
+    bulk=("https://api.huobi.pro/market/tickers",
+          {}, lambda j: _book(j.get("data"), "symbol", "bid", "ask")),
+    depth=("https://api.huobi.pro/market/depth",
+           lambda s, n: {"symbol": s, "type": "step0", "depth": n},
+           lambda j, n: _depth(j.get("tick") or {}, "bids", "asks", n)),
+    depth_sizes=(5, 10, 20),
+))
+register_adapter(RestAdapter(
+    "kucoin", "🟠 kucoin", 10, lambda b, q: f"{b}-{q}",
+    ticker=("https://api.kucoin.com/api/v1/market/orderbook/level1",
+            lambda s: {"symbol": s}, lambda j: _ba(j.get("data") or {}, "bestBid", "bestAsk")),
+    bulk=("https://api.kucoin.com/api/v1/market/allTickers",
+          {}, lambda j: _book((j.get("data") or {}).get("ticker"), "symbol", "buy", "sell")),
+    depth=("https://api.kucoin.com/api/v1/market/orderbook/level2_20",
+           lambda s, n: {"symbol": s},
+           lambda j, n: _depth(j.get("data") or {}, "bids", "asks", n)),
+    depth_sizes=(20,),
+))
+register_adapter(RestAdapter(
+    "bybit", "🟤 bybit", 10, lambda b, q: f"{b}{q}",
+    ticker=("https://api.bybit.com/v5/market/tickers",
+            lambda s: {"category": "spot", "symbol": s},
+            lambda j: _ba(_first((j.get("result") or {}).get("list")), "bid1Price", "ask1Price")),
+    bulk=("https://api.bybit.com/v5/market/tickers",
+          {"category": "spot"},
+          lambda j: _book((j.get("result") or {}).get("list"), "symbol", "bid1Price", "ask1Price")),
+    depth=("https://api.bybit.com/v5/market/orderbook",
+           lambda s, n: {"category": "spot", "symbol": s, "limit": n},
+           lambda j, n: _depth(j.get("result") or {}, "b", "a", n)),
+))
+register_adapter(RestAdapter(
+    "okx", "⚫ okx", 10, lambda b, q: f"{b}-{q}",
+    ticker=("https://www.okx.com/api/v5/market/ticker",
+            lambda s: {"instId": s}, lambda j: _ba(_first(j.get("data")), "bidPx", "askPx")),
+    bulk=("https://www.okx.com/api/v5/market/tickers",
+          {"instType": "SPOT"}, lambda j: _book(j.get("data"), "instId", "bidPx", "askPx")),
+    depth=("https://www.okx.com/api/v5/market/books",
+           lambda s, n: {"instId": s, "sz": n},
+           lambda j, n: _depth(_first(j.get("data")), "bids", "asks", n)),
+))
+register_adapter(RestAdapter(
+    "gate", "🔷 gate", 10, lambda b, q: f"{b}_{q}",
+    ticker=("https://api.gateio.ws/api/v4/spot/tickers",
+            lambda s: {"currency_pair": s}, lambda j: _ba(_first(j), "highest_bid", "lowest_ask")),
+    bulk=("https://api.gateio.ws/api/v4/spot/tickers",
+          {}, lambda j: _book(j, "currency_pair", "highest_bid", "lowest_ask")),
+    depth=("https://api.gateio.ws/api/v4/spot/order_book",
+           lambda s, n: {"currency_pair": s, "limit": n},
+           lambda j, n: _depth(j, "bids", "asks", n)),
+))
+
+def ccxt_has(ex_id: str) -> bool:
+    # looked up on disk so startup doesn't pay for importing ccxt
+    spec = importlib.util.find_spec("ccxt")
+    if spec is None or not spec.submodule_search_locations:
+        return False
+    root = list(spec.submodule_search_locations)[0]
+    return os.path.exists(os.path.join(root, "async_support", f"{ex_id}.py"))
+
+for _ex_id in CCXT_EXCHANGES:
+    if _ex_id in ADAPTERS:
+        log.warning("CCXT_EXCHANGES: %r skipped (already served by the built-in adapter)", _ex_id)
+        continue
+    if not ccxt_has(_ex_id):
+        log.warning("CCXT_EXCHANGES: %r skipped (ccxt missing or unknown exchange id)", _ex_id)
+        continue
+    register_adapter(CcxtAdapter(_ex_id))
+
 # ----------------------- EXCHANGE QUOTES -----------------------
 
-def q_binance(s: str):
-    r = requests.get("https://api.binance.com/api/v3/ticker/bookTicker",
-                     params={"symbol": s}, timeout=10)
-    if r.ok:
-        j = r.json()
-        return float(j["bidPrice"]), float(j["askPrice"])
-    return None, None
-
-def q_bitget(s: str):
-    r = requests.get("https://api.bitget.com/api/spot/v1/market/bestBidAsk",
-                     params={"symbol": s}, timeout=10)
-    if r.ok:
-        j = r.json()
-        if j.get("data"):
-            d = j["data"][0]
-            return float(d["bestBid"]), float(d["bestAsk"])
-    return None, None
-
-def q_mexc(s: str):
-    r = requests.get("https://api.mexc.com/api/v3/ticker/bookTicker",
-                     params={"symbol": s}, timeout=10)
-    if r.ok:
-        j = r.json()
-        return float(j["bidPrice"]), float(j["askPrice"])
-    return None, None
-
-def q_htx(s: str):
-    r = requests.get("https://api.huobi.pro/market/detail/merged",
-                     params={"symbol": s}, timeout=10)
-    if r.ok:
-        j = r.json()
-        if j.get("tick"):
-            t = j["tick"]
-            return float(t["bid"][0]), float(t["ask"][0])
-    return None, None
-
-def q_kucoin(s: str):
-    r = requests.get("https://api.kucoin.com/api/v1/market/orderbook/level1",
-                     params={"symbol": s}, timeout=10)
-    if r.ok:
-        j = r.json()
-        if j.get("data"):
-            d = j["data"]
-            return float(d["bestBid"]), float(d["bestAsk"])
-    return None, None
-
-def q_bybit(s: str):
-    r = requests.get("https://api.bybit.com/v5/market/tickers",
-                     params={"category": "spot", "symbol": s}, timeout=10)
-    if r.ok:
-        j = r.json()
-        if j.get("result") and j["result"].get("list"):
-            d = j["result"]["list"][0]
-            return float(d["bid1Price"]), float(d["ask1Price"])
-    return None, None
-
-def q_okx(s: str):
-    r = requests.get("https://www.okx.com/api/v5/market/ticker",
-                     params={"instId": s}, timeout=10)
-    if r.ok:
-        j = r.json()
-        if j.get("data"):
-            d = j["data"][0]
-            return float(d["bidPx"]), float(d["askPx"])
-    return None, None
-
-def q_gate(s: str):
-    r = requests.get("https://api.gateio.ws/api/v4/spot/tickers",
-                     params={"currency_pair": s}, timeout=10)
-    if r.ok:
-        j = r.json()
-        if j:
-            d = j[0]
-            return float(d["highest_bid"]), float(d["lowest_ask"])
-    return None, None
-
-EXCHS = [
-    ("🟡 binance", "binance", q_binance),
-    ("🔵 bitget",  "bitget",  q_bitget),
-    ("🟢 mexc",    "mexc",    q_mexc),
-    ("🔴 htx",     "htx",     q_htx),
-    ("🟠 kucoin",  "kucoin",  q_kucoin),
-    ("🟤 bybit",   "bybit",   q_bybit),
-    ("⚫ okx",     "okx",     q_okx),
-    ("🔷 gate",    "gate",    q_gate),
-]
+async def _ticker_or_none(ad: Adapter, pair: str) -> Optional[Tuple[float,float]]:
+    try:
+        return await ad.ticker(pair)
+    except Exception as e:
+        log.warning("fetch %s %s failed: %s", ad.key, ad.symbol(pair), e)
+        return None
 
-def fetch_all(pair: str) -> List[Tuple[str,float,float]]:
-    out = []
-    for label, key, fn in EXCHS:
-        sym = norm_pair_for_exch(pair, key)
+async def _venue_quotes(ad: Adapter, pairs: List[str]) -> Dict[str, Tuple[float,float]]:
+    # one bulk call serves many pairs; a single pair only uses a still-fresh
+    # snapshot, otherwise the small ticker endpoint is cheaper
+    snap = None
+    if len(pairs) > 1 or ad.bulk_fresh():
         try:
-            bid, ask = fn(sym)
-            if bid and ask and bid > 0 and ask > 0:
-                out.append((label, bid, ask))
+            snap = await ad.bulk()
         except Exception as e:
-            log.warning("fetch %s %s failed: %s", key, sym, e)
-    return out
+            log.warning("bulk %s failed: %s", ad.key, e)
+        if not ad.ready():
+            return {}
+    if snap is not None:
+        return {p: snap.get(ad.symbol(p)) for p in pairs}
+    quotes = await asyncio.gather(*(_ticker_or_none(ad, p) for p in pairs))
+    return dict(zip(pairs, quotes))
+
+async def _venue_quotes_timed(ad: Adapter, pairs: List[str]) -> Dict[str, Tuple[float,float]]:
+    # a slow venue is dropped from this scan instead of holding up the reply
+    try:
+        return await asyncio.wait_for(_venue_quotes(ad, pairs), VENUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        log.warning("venue %s timed out after %ss", ad.key, VENUE_TIMEOUT)
+        return {}
+
+async def fetch_many_async(pairs: List[str]) -> Dict[str, List[Tuple[str,float,float]]]:
+    ads = [ad for ad in ADAPTERS.values() if ad.ready()]
+    per_venue = await asyncio.gather(*(_venue_quotes_timed(ad, pairs) for ad in ads))
+    rows: Dict[str, List[Tuple[str,float,float]]] = {p: [] for p in pairs}
+    for ad, quotes in zip(ads, per_venue):
+        for pair in pairs:
+            bid, ask = quotes.get(pair) or (0.0, 0.0)
+            if bid and ask and bid > 0 and ask > 0:
+                rows[pair].append((ad.label, bid, ask))
+    return rows
+
+def fetch_many(pairs: List[str]) -> Dict[str, List[Tuple[str,float,float]]]:
+    return run_async(fetch_many_async(pairs))
+
+def fetch_all(pair: str) -> List[Tuple[str,float,float]]:
+    return fetch_many([pair])[pair]
+
+async def _close_all():
+    await asyncio.gather(*(ad.close() for ad in ADAPTERS.values()), return_exceptions=True)
+
+def close_adapters(timeout: float = 5):
+    if _LOOP is None:
+        return  # no scan ran, nothing was opened
+    fut = asyncio.run_coroutine_threadsafe(_close_all(), _LOOP)
+    try:
+        fut.result(timeout)
+    except Exception as e:
+        log.warning("closing adapters failed: %s", e)
+
+def fetch_depth(pair: str, exch: str, n: int = 5) -> Tuple[List[List[float]], List[List[float]]]:
+    ad = ADAPTERS.get(exch)
+    if not ad:
+        log.warning("depth: unknown exchange %s", exch)
+        return [], []
+    try:
+        return run_async(ad.depth(pair, n))
+    except Exception as e:
+        log.warning("depth %s %s failed: %s", exch, ad.symbol(pair), e)
+        return [], []
 
 def best_spread(rows: List[Tuple[str,float,float]]) -> Tuple[float,str,str,float,float]:
     if not rows: return (0,"","",0,0)
@@ -485,8 +855,7 @@ def do_change_pair(chat_id: int, txt: str = ""):
 def do_top(chat_id: int):
     s = st(chat_id); tr = T(chat_id)
     lines = []
-    for pair in WATCHLIST:
-        rows = fetch_all(pair)
+    for pair, rows in fetch_many(WATCHLIST).items():
         pct, bx, sx, bp, sp = best_spread(rows)
         if pct > 0:
             lines.append( (pct, pair, bx, sx, bp, sp) )
@@ -618,8 +987,7 @@ def autoscan_loop():
             best: Tuple[float,str,str,str,float,float] = (0.0, "", "", "", 0.0, 0.0)
             best_rows: Optional[List[Tuple[str,float,float]]] = None
 
-            for pair in WATCHLIST:
-                rows = fetch_all(pair)
+            for pair, rows in fetch_many(WATCHLIST).items():
                 pct, bx, sx, bp, sp = best_spread(rows)
                 if pct > best[0]:
                     best = (pct, pair, bx, sx, bp, sp)
@@ -661,5 +1029,9 @@ if __name__ == "__main__":
     me = tg("getMe")
     log.info("Bot up as @%s", (me.get("result") or {}).get("username", "?"))
     threading.Thread(target=autoscan_loop, daemon=True).start()
-    poll_loop()
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))  # run the cleanup below on SIGTERM too
+    try:
+        poll_loop()
+    finally:
+        close_adapters()
 
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# main.py refuses to import without a bot token; tests never talk to Telegram
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "test-token")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,427 @@
+import asyncio
+import json
+import os
+import sys
+import time
+import types
+from typing import Optional
+
+import pytest
+
+import main
+
+# trimmed real-shape responses of each venue's bulk ticker endpoint
+BULK_FIXTURES = {
+    "binance": [
+        {"symbol": "BTCUSDT", "bidPrice": "100.5", "bidQty": "1", "askPrice": "100.6", "askQty": "2"},
+        {"symbol": "ETHUSDT", "bidPrice": "10", "bidQty": "1", "askPrice": "11", "askQty": "2"},
+    ],
+    "bitget": {"code": "00000", "data": [
+        {"symbol": "BTCUSDT", "bidPr": "100.5", "askPr": "100.6", "lastPr": "100.5"},
+        {"symbol": "ETHUSDT", "bidPr": "10", "askPr": "11", "lastPr": "10"},
+    ]},
+    "mexc": [
+        {"symbol": "BTCUSDT", "bidPrice": "100.5", "bidQty": "1", "askPrice": "100.6", "askQty": "2"},
+        {"symbol": "ETHUSDT", "bidPrice": "10", "bidQty": "1", "askPrice": "11", "askQty": "2"},
+    ],
+    "htx": {"status": "ok", "data": [
+        {"symbol": "btcusdt", "bid": 100.5, "bidSize": 1, "ask": 100.6, "askSize": 2},
+        {"symbol": "ethusdt", "bid": 10, "bidSize": 1, "ask": 11, "askSize": 2},
+    ]},
+    "kucoin": {"code": "200000", "data": {"time": 1, "ticker": [
+        {"symbol": "BTC-USDT", "buy": "100.5", "sell": "100.6", "last": "100.5"},
+        {"symbol": "ETH-USDT", "buy": "10", "sell": "11", "last": "10"},
+    ]}},
+    "bybit": {"retCode": 0, "result": {"category": "spot", "list": [
+        {"symbol": "BTCUSDT", "bid1Price": "100.5", "ask1Price": "100.6"},
+        {"symbol": "ETHUSDT", "bid1Price": "10", "ask1Price": "11"},
+    ]}},
+    "okx": {"code": "0", "data": [
+        {"instType": "SPOT", "instId": "BTC-USDT", "bidPx": "100.5", "askPx": "100.6"},
+        {"instType": "SPOT", "instId": "ETH-USDT", "bidPx": "10", "askPx": "11"},
+    ]},
+    "gate": [
+        {"currency_pair": "BTC_USDT", "highest_bid": "100.5", "lowest_ask": "100.6"},
+        {"currency_pair": "ETH_USDT", "highest_bid": "10", "lowest_ask": "11"},
+    ],
+}
+
+
+def fresh_adapter(key):
+    # same declaration as the registered venue, but its own snapshot and limiter
+    ad = main.ADAPTERS[key]
+    return main.RestAdapter(key, ad.label, 0, ad.fmt, ad.ticker_ep, ad.bulk_ep, ad.depth_ep,
+                            ad.depth_sizes)
+
+
+def stub_get(monkeypatch, ad, payload):
+    calls = []
+
+    async def fake_get(url, params):
+        calls.append((url, params))
+        return payload
+
+    monkeypatch.setattr(ad, "_get", fake_get)
+    return calls
+
+
+@pytest.mark.parametrize("key", sorted(BULK_FIXTURES))
+def test_bulk_parser(monkeypatch, key):
+    ad = main.ADAPTERS[key]
+    stub_get(monkeypatch, ad, BULK_FIXTURES[key])
+    snap = asyncio.run(ad.fetch_bulk())
+    assert snap[ad.symbol("BTC/USDT")] == (100.5, 100.6)
+    assert snap[ad.symbol("ETH/USDT")] == (10.0, 11.0)
+
+
+@pytest.mark.parametrize("key", sorted(BULK_FIXTURES))
+def test_bulk_parser_error_body(monkeypatch, key):
+    ad = main.ADAPTERS[key]
+    stub_get(monkeypatch, ad, {"code": "400", "msg": "bad request"})
+    assert asyncio.run(ad.fetch_bulk()) is None
+
+
+def test_error_body_falls_back_to_ticker(monkeypatch):
+    # okx: rate-limit body on /tickers (HTTP 200) while /ticker still works
+    ad = fresh_adapter("okx")
+    bodies = {
+        "tickers": {"code": "50011", "msg": "Too Many Requests", "data": []},
+        "ticker": {"code": "0", "data": [{"instId": "BTC-USDT", "bidPx": "100.5", "askPx": "100.6"}]},
+    }
+
+    async def fake_get(url, params):
+        return bodies[url.rsplit("/", 1)[1]]
+
+    monkeypatch.setattr(ad, "_get", fake_get)
+
+    async def scenario():
+        many = await main._venue_quotes(ad, ["BTC/USDT", "ETH/USDT"])
+        single = await main._venue_quotes(ad, ["BTC/USDT"])
+        return many, single
+
+    many, single = asyncio.run(scenario())
+    assert many["BTC/USDT"] == (100.5, 100.6)
+    assert single["BTC/USDT"] == (100.5, 100.6)
+    assert not ad.bulk_fresh()
+
+
+def test_htx_ticker_reads_tick_levels(monkeypatch):
+    ad = main.ADAPTERS["htx"]
+    stub_get(monkeypatch, ad, {"status": "ok", "tick": {"bid": [99.0, 1], "ask": [99.5, 2]}})
+    assert asyncio.run(ad.ticker("BTC/USDT")) == (99.0, 99.5)
+
+
+@pytest.mark.parametrize("key,asked,sent", [("htx", 3, 5), ("htx", 50, 20), ("binance", 7, 10)])
+def test_depth_rounds_to_allowed_size(monkeypatch, key, asked, sent):
+    ad = main.ADAPTERS[key]
+    book = {"bids": [[str(i), "1"] for i in range(30)], "asks": [[str(i), "1"] for i in range(30)]}
+    payload = {"tick": book} if key == "htx" else book
+    calls = stub_get(monkeypatch, ad, payload)
+    bids, asks = asyncio.run(ad.depth("BTC/USDT", asked))
+    assert sent in calls[0][1].values()
+    assert len(bids) == len(asks) == min(asked, 30)
+
+
+def test_fetch_depth_unknown_exchange():
+    assert main.fetch_depth("BTC/USDT", "nope") == ([], [])
+
+
+
+# ----------------------- scan orchestration -----------------------
+
+def routed_get(monkeypatch, ad, bodies, delay=0.0):
+    # answers by the last path segment of the url and records which were hit
+    calls = []
+
+    async def fake_get(url, params):
+        calls.append(url.rsplit("/", 1)[1])
+        await asyncio.sleep(delay)
+        return bodies[calls[-1]]
+
+    monkeypatch.setattr(ad, "_get", fake_get)
+    return calls
+
+
+def test_venue_quotes_uses_bulk_for_many_pairs(monkeypatch):
+    ad = fresh_adapter("binance")
+    calls = routed_get(monkeypatch, ad, {"bookTicker": BULK_FIXTURES["binance"]})
+    quotes = asyncio.run(main._venue_quotes(ad, ["BTC/USDT", "ETH/USDT", "DOGE/USDT"]))
+    assert calls == ["bookTicker"]
+    assert quotes == {"BTC/USDT": (100.5, 100.6), "ETH/USDT": (10.0, 11.0), "DOGE/USDT": None}
+
+
+def test_venue_quotes_single_pair_uses_ticker(monkeypatch):
+    ad = fresh_adapter("okx")
+    calls = routed_get(monkeypatch, ad, {
+        "ticker": {"code": "0", "data": [{"instId": "BTC-USDT", "bidPx": "1", "askPx": "2"}]},
+    })
+    assert asyncio.run(main._venue_quotes(ad, ["BTC/USDT"])) == {"BTC/USDT": (1.0, 2.0)}
+    assert calls == ["ticker"]
+
+
+def test_venue_quotes_single_pair_reuses_fresh_snapshot(monkeypatch):
+    ad = fresh_adapter("okx")
+    calls = routed_get(monkeypatch, ad, {"tickers": BULK_FIXTURES["okx"]})
+
+    async def scenario():
+        await main._venue_quotes(ad, ["BTC/USDT", "ETH/USDT"])
+        return await main._venue_quotes(ad, ["BTC/USDT"])
+
+    assert asyncio.run(scenario()) == {"BTC/USDT": (100.5, 100.6)}
+    assert calls == ["tickers"]
+
+
+def test_venue_quotes_gathers_ticker_fallback(monkeypatch):
+    ad = fresh_adapter("okx")
+    one = {"code": "0", "data": [{"instId": "X-USDT", "bidPx": "1", "askPx": "2"}]}
+    calls = routed_get(monkeypatch, ad, {"tickers": {"code": "50011", "data": []}, "ticker": one},
+                       delay=0.1)
+    pairs = [f"P{i}/USDT" for i in range(10)]
+    started = time.monotonic()
+    quotes = asyncio.run(main._venue_quotes(ad, pairs))
+    assert time.monotonic() - started < 0.5  # 10 tickers at 0.1s each, not one after another
+    assert calls.count("ticker") == 10
+    assert all(q == (1.0, 2.0) for q in quotes.values())
+
+
+def test_slow_venue_dropped_from_scan(monkeypatch):
+    monkeypatch.setattr(main, "VENUE_TIMEOUT", 0.1)
+    fast, slow = fresh_adapter("gate"), fresh_adapter("okx")
+    routed_get(monkeypatch, fast, {"tickers": BULK_FIXTURES["gate"]})
+    routed_get(monkeypatch, slow, {"tickers": BULK_FIXTURES["okx"]}, delay=5)
+    monkeypatch.setattr(main, "ADAPTERS", {"gate": fast, "okx": slow})
+    started = time.monotonic()
+    rows = asyncio.run(main.fetch_many_async(["BTC/USDT", "ETH/USDT"]))
+    assert time.monotonic() - started < 1
+    assert rows["BTC/USDT"] == [(fast.label, 100.5, 100.6)]
+    assert rows["ETH/USDT"] == [(fast.label, 10.0, 11.0)]
+
+
+# ----------------------- markets cache -----------------------
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "MARKETS_CACHE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_markets_cache_round_trip(cache_dir):
+    markets = {"BTC/USDT": {"id": "BTCUSDT", "precision": {"price": 0.01}}}
+    main.save_markets_cache("kraken", markets, {"BTC": {"id": "XBT"}})
+    data = main.load_markets_cache("kraken")
+    assert data["markets"] == markets
+    assert data["currencies"] == {"BTC": {"id": "XBT"}}
+    assert data["saved_at"] == pytest.approx(time.time(), abs=5)
+
+
+def test_markets_cache_expired(cache_dir):
+    main.save_markets_cache("kraken", {"BTC/USDT": {}}, {})
+    old = time.time() - main.MARKETS_TTL - 60
+    os.utime(cache_dir / "kraken.json", (old, old))
+    assert main.load_markets_cache("kraken") is None
+
+
+@pytest.mark.parametrize("body", ["{not json", json.dumps({"foo": 1}), json.dumps([1, 2])])
+def test_markets_cache_corrupt(cache_dir, body):
+    (cache_dir / "kraken.json").write_text(body, encoding="utf-8")
+    assert main.load_markets_cache("kraken") is None
+
+
+def test_markets_cache_missing(cache_dir):
+    assert main.load_markets_cache("kraken") is None
+
+
+# ----------------------- ccxt adapter -----------------------
+
+class FakeExchange:
+    # stands in for a ccxt.async_support exchange class
+    load_delay = 0.0
+    load_error: Optional[Exception] = None
+    markets_on_load = {"BTC/USDT": {"id": "BTCUSDT"}, "ETH/USDT": {"id": "ETHUSDT"}}
+    tickers = {"BTC/USDT": {"bid": 100.5, "ask": 100.6}, "ETH/USDT": {"bid": 10, "ask": 11}}
+    opened: list = []
+
+    def __init__(self, config):
+        self.config = config
+        self.markets: dict = {}
+        self.currencies: dict = {}
+        self.has = {"fetchTickers": True}
+        self.loads = []
+        self.restored = False
+        self.closed = False
+        FakeExchange.opened.append(self)
+
+    def set_markets(self, markets, currencies=None):
+        self.markets, self.currencies, self.restored = markets, currencies or {}, True
+
+    async def load_markets(self, reload=False):
+        self.loads.append(reload)
+        await asyncio.sleep(self.load_delay)
+        if self.load_error:
+            raise self.load_error
+        self.markets = dict(self.markets_on_load)
+        return self.markets
+
+    async def fetch_ticker(self, symbol):
+        return self.tickers[symbol]
+
+    async def fetch_tickers(self):
+        return self.tickers
+
+    async def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def fake_ccxt(monkeypatch, cache_dir):
+    pkg = types.ModuleType("ccxt")
+    mod = types.ModuleType("ccxt.async_support")
+    mod.fakex = FakeExchange
+    pkg.async_support = mod
+    monkeypatch.setitem(sys.modules, "ccxt", pkg)
+    monkeypatch.setitem(sys.modules, "ccxt.async_support", mod)
+    monkeypatch.setattr(FakeExchange, "opened", [])
+    return FakeExchange
+
+
+def test_ccxt_cold_start_survives_scan_timeout(monkeypatch, fake_ccxt):
+    monkeypatch.setattr(main, "VENUE_TIMEOUT", 0.05)
+    monkeypatch.setattr(fake_ccxt, "load_delay", 0.2)
+
+    async def scenario():
+        ad = main.CcxtAdapter("fakex")
+        pairs = ["BTC/USDT", "ETH/USDT"]
+        for _ in range(3):
+            assert await main._venue_quotes_timed(ad, pairs) == {}
+        await asyncio.sleep(0.3)
+        quotes = await main._venue_quotes_timed(ad, pairs)
+        await ad.close()
+        return ad, quotes
+
+    ad, quotes = asyncio.run(scenario())
+    assert quotes["BTC/USDT"] == (100.5, 100.6)
+    assert len(fake_ccxt.opened) == 1  # timed-out scans shared one setup
+    assert fake_ccxt.opened[0].closed
+    assert ad._retry_at == 0.0
+    assert main.load_markets_cache("fakex")["markets"] == fake_ccxt.markets_on_load
+
+
+def test_ccxt_close_during_setup_closes_client(monkeypatch, fake_ccxt):
+    monkeypatch.setattr(main, "VENUE_TIMEOUT", 0.05)
+    monkeypatch.setattr(fake_ccxt, "load_delay", 10)
+
+    async def scenario():
+        ad = main.CcxtAdapter("fakex")
+        assert await main._venue_quotes_timed(ad, ["BTC/USDT"]) == {}
+        await ad.close()
+
+    asyncio.run(scenario())
+    assert [ex.closed for ex in fake_ccxt.opened] == [True]
+
+
+def test_ccxt_import_does_not_block_loop(monkeypatch, fake_ccxt):
+    real_import = main.importlib.import_module
+
+    def slow_import(name):
+        time.sleep(0.2)  # a cold `import ccxt` takes seconds
+        return real_import(name)
+
+    monkeypatch.setattr(main.importlib, "import_module", slow_import)
+
+    async def scenario():
+        ad = main.CcxtAdapter("fakex")
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        t = asyncio.ensure_future(ticker())
+        await ad.client()
+        t.cancel()
+        await ad.close()
+        return ticks
+
+    assert asyncio.run(scenario()) >= 5
+
+
+def test_ccxt_setup_failure_backs_off(monkeypatch, fake_ccxt):
+    monkeypatch.setattr(fake_ccxt, "load_error", RuntimeError("exchange down"))
+
+    ad = main.CcxtAdapter("fakex")
+    monkeypatch.setattr(main, "ADAPTERS", {"fakex": ad})
+
+    async def scenario():
+        for _ in range(3):
+            with pytest.raises(RuntimeError):
+                await ad.client()
+        assert not ad.ready()
+        assert len(fake_ccxt.opened) == 1  # later calls didn't retry setup
+        assert fake_ccxt.opened[0].closed
+        assert await main.fetch_many_async(["BTC/USDT", "ETH/USDT"]) == {"BTC/USDT": [], "ETH/USDT": []}
+        assert len(fake_ccxt.opened) == 1  # venue sat the scan out
+
+        fake_ccxt.load_error = None
+        ad._retry_at = time.time() - 1  # backoff over
+        assert ad.ready()
+        ex = await ad.client()
+        await ad.close()
+        return ex
+
+    ex = asyncio.run(scenario())
+    assert len(fake_ccxt.opened) == 2
+    assert ex.markets == fake_ccxt.markets_on_load
+
+
+def test_ccxt_restores_markets_from_disk_cache(fake_ccxt):
+    markets = {"BTC/USDT": {"id": "BTCUSDT"}}
+    main.save_markets_cache("fakex", markets, {"BTC": {}})
+
+    async def scenario():
+        ad = main.CcxtAdapter("fakex")
+        ex = await ad.client()
+        quote = await ad.ticker("BTC/USDT")
+        unlisted = await ad.ticker("ETH/USDT")
+        await ad.close()
+        return ad, ex, quote, unlisted
+
+    ad, ex, quote, unlisted = asyncio.run(scenario())
+    assert ex.restored and ex.loads == []
+    assert ex.markets == markets
+    assert ad._markets_at == main.load_markets_cache("fakex")["saved_at"]
+    assert quote == (100.5, 100.6)
+    assert unlisted == (0.0, 0.0)
+
+
+def test_ccxt_refreshes_stale_markets(fake_ccxt):
+    async def scenario():
+        ad = main.CcxtAdapter("fakex")
+        ex = await ad.client()
+        main.save_markets_cache("fakex", {"OLD/USDT": {}}, {})
+        ad._markets_at = time.time() - main.MARKETS_TTL - 1
+        ex.markets = {"OLD/USDT": {}}
+        assert await ad.client() is ex  # served right away, refresh runs behind it
+        await ad._refresh
+        await ad.close()
+        return ad, ex
+
+    ad, ex = asyncio.run(scenario())
+    assert ex.loads == [False, True]
+    assert ex.markets == fake_ccxt.markets_on_load
+    assert main.load_markets_cache("fakex")["markets"] == fake_ccxt.markets_on_load
+    assert time.time() - ad._markets_at < 5
+
+
+def test_ccxt_close_releases_client(fake_ccxt):
+    async def scenario():
+        ad = main.CcxtAdapter("fakex")
+        ex = await ad.client()
+        await ad.close()
+        await ad.close()  # idempotent
+        return ad, ex
+
+    ad, ex = asyncio.run(scenario())
+    assert ex.closed
+    assert ad._ex is None